@@ -2,13 +2,27 @@
 Audio utilities for loading, converting, and preprocessing audio files.
 """
 import base64
+import io
 import tempfile
 import os
 import logging
-from typing import Tuple, Optional
+import threading
+from typing import BinaryIO, Tuple, Optional, Union
+
+# Keep Numba's compiled-kernel cache in one place shared by every worker so a
+# restarted worker reuses it. Must be set before numba is first imported.
+os.environ.setdefault("NUMBA_CACHE_DIR", os.path.join(tempfile.gettempdir(), "numba_cache"))
+
 import numpy as np
 import soundfile as sf
-import librosa
+from numba import njit
+
+# Bind the decode/resample entry points once. Importing them through librosa's
+# lazy loader here also resolves its audio backend at startup rather than on
+# the first request.
+from soundfile import SoundFile as _SoundFile
+from soxr import resample as _soxr_resample
+from librosa import load as _librosa_load
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +31,15 @@ MAX_AUDIO_SIZE_MB = 25  # Maximum base64 decoded size in MB
 MAX_DURATION_SECONDS = 300  # Maximum 5 minutes
 MIN_DURATION_SECONDS = 1  # Minimum 1 second
 
+# Formats libsndfile decodes natively. Anything else (m4a/webm from mobile
+# recorders, mp3) goes through librosa, which falls back to audioread/ffmpeg.
+SOUNDFILE_FORMATS = {'.wav', '.flac', '.ogg'}
+
+# Per-thread decode buffer reused across requests so the common case (a
+# recording of a minute or less) doesn't allocate and fault in fresh pages.
+_SCRATCH = threading.local()
+SCRATCH_MIN_SAMPLES = 16000 * 60
+
 
 def detect_audio_format(audio_bytes: bytes) -> str:
     """
@@ -107,8 +130,6 @@ def load_audio_from_base64(base64_str: str, target_sr: int = 16000) -> Tuple[np.
     # Validate size before decoding
     validate_audio_size(base64_str)
     
-    temp_path: Optional[str] = None
-    
     try:
         # Decode base64 to bytes
         audio_bytes = base64.b64decode(base64_str)
@@ -117,19 +138,28 @@ def load_audio_from_base64(base64_str: str, target_sr: int = 16000) -> Tuple[np.
         file_extension = detect_audio_format(audio_bytes)
         logger.info(f"Detected audio format: {file_extension}")
         
-        # Create temporary file with correct extension
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension)
-        temp_path = temp_file.name
-        temp_file.write(audio_bytes)
-        temp_file.close()
+        # Decode to mono float32 at the target sample rate
+        if file_extension in SOUNDFILE_FORMATS:
+            # libsndfile reads straight from memory, no temp file needed
+            try:
+                audio, sr = _decode_with_soundfile(io.BytesIO(audio_bytes), target_sr)
+            except sf.LibsndfileError as e:
+                # e.g. a RIFF/WAV wrapping MP3 or another codec libsndfile
+                # can't decode; librosa falls back to audioread for these
+                logger.info(f"soundfile could not decode {file_extension}, using librosa: {e}")
+                audio, sr = _decode_with_librosa(audio_bytes, file_extension, target_sr)
+        else:
+            audio, sr = _decode_with_librosa(audio_bytes, file_extension, target_sr)
         
-        # Load audio using librosa
-        audio, sr = librosa.load(temp_path, sr=target_sr, mono=True)
+        # Keep the pipeline in contiguous float32: half the memory traffic of
+        # float64 for every downstream feature extractor
+        audio = np.ascontiguousarray(audio, dtype=np.float32)
         
         # Validate duration
         validate_audio_duration(audio, sr)
         
-        # Normalize audio to prevent clipping
+        # Normalize audio to prevent clipping. This writes a fresh array, so
+        # the caller never holds a view of the decode scratch buffer.
         audio = normalize_audio(audio)
         
         return audio, sr
@@ -140,6 +170,88 @@ def load_audio_from_base64(base64_str: str, target_sr: int = 16000) -> Tuple[np.
     except Exception as e:
         logger.error(f"Failed to load audio from base64: {str(e)}")
         raise ValueError(f"Failed to load audio from base64: {str(e)}")
+
+
+def _scratch_buffer(size: int) -> np.ndarray:
+    """
+    Return a float32 view of `size` samples from this thread's scratch buffer.
+    
+    The buffer is fixed at SCRATCH_MIN_SAMPLES; larger requests get a
+    one-off array so a single long upload doesn't stay pinned per thread.
+    """
+    if size > SCRATCH_MIN_SAMPLES:
+        return np.empty(size, dtype=np.float32)
+    buf = getattr(_SCRATCH, 'buf', None)
+    if buf is None:
+        _SCRATCH.buf = buf = np.empty(SCRATCH_MIN_SAMPLES, dtype=np.float32)
+    return buf[:size]
+
+
+def _decode_with_soundfile(source: Union[str, BinaryIO], target_sr: int) -> Tuple[np.ndarray, int]:
+    """
+    Decode libsndfile-supported audio to mono float32 and resample with soxr.
+    
+    Matches librosa.load(source, sr=target_sr, mono=True), which also
+    resamples with soxr, except librosa may pad one trailing sample.
+    
+    Args:
+        source: Path or file-like object with the encoded audio
+        target_sr: Target sample rate
+        
+    Returns:
+        Tuple of (audio_array, sample_rate). When no downmix or resample is
+        needed the array is a view of the thread's scratch buffer and is
+        only valid until the next decode on this thread.
+        
+    Raises:
+        ValueError: If the header reports audio longer than MAX_DURATION_SECONDS
+    """
+    with _SoundFile(source) as f:
+        sr = f.samplerate
+        # Reject over-long audio from the header before allocating for it
+        duration = f.frames / sr
+        if duration > MAX_DURATION_SECONDS:
+            raise ValueError(
+                f"Audio too long: {duration:.1f}s exceeds {MAX_DURATION_SECONDS}s limit"
+            )
+        out = _scratch_buffer(f.frames * f.channels)
+        if f.channels > 1:
+            out = out.reshape(f.frames, f.channels)
+        # Returns a view of `out`, trimmed if the header over-reported frames
+        audio = f.read(out=out)
+    
+    if audio.ndim > 1:
+        # Downmix to mono
+        audio = audio.mean(axis=1)
+    
+    return resample_audio(audio, sr, target_sr), target_sr
+
+
+def _decode_with_librosa(audio_bytes: bytes, file_extension: str, target_sr: int) -> Tuple[np.ndarray, int]:
+    """
+    Decode containers libsndfile can't read (m4a, webm, mp3) via librosa.
+    
+    librosa hands these off to audioread/ffmpeg, which needs a real file,
+    so the bytes are staged in a temp file for the duration of the decode.
+    
+    Args:
+        audio_bytes: Raw audio bytes
+        file_extension: Detected file extension
+        target_sr: Target sample rate
+        
+    Returns:
+        Tuple of (audio_array, sample_rate)
+    """
+    temp_path: Optional[str] = None
+    
+    try:
+        # Create temporary file with correct extension
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=file_extension)
+        temp_path = temp_file.name
+        temp_file.write(audio_bytes)
+        temp_file.close()
+        
+        return _librosa_load(temp_path, sr=target_sr, mono=True)
     finally:
         # Always clean up temp file
         if temp_path and os.path.exists(temp_path):
@@ -158,20 +270,51 @@ def normalize_audio(audio: np.ndarray, target_level: float = 0.3) -> np.ndarray:
         target_level: Target RMS level (0-1)
         
     Returns:
-        Normalized audio array
+        Normalized float32 audio array
     """
-    # Calculate current RMS
-    rms = np.sqrt(np.mean(audio**2))
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
     
-    if rms > 0:
-        # Scale to target level
-        scaling_factor = target_level / rms
-        audio = audio * scaling_factor
-        
-    # Clip to prevent values outside [-1, 1]
-    audio = np.clip(audio, -1.0, 1.0)
+    # Nothing to scale in silent or empty input. any() stops at the first
+    # nonzero sample, so real speech pays next to nothing for the check.
+    # np.zeros comes from calloc, and still gives the caller a fresh array.
+    if not audio.any():
+        return np.zeros(audio.shape, dtype=np.float32)
+    
+    normalized = np.empty_like(audio)
+    _normalize_kernel(audio.reshape(-1), normalized.reshape(-1), target_level)
+    
+    return normalized
+
+
+@njit(cache=True, fastmath=True)
+def _normalize_kernel(audio, out, target_level):
+    """
+    Fused RMS normalization: one pass for the sum of squares, one pass to
+    scale and clip into `out`. LLVM vectorizes both loops.
+    """
+    n = audio.size
+    
+    # Vectorizes to the same SIMD multiply-add as BLAS sdot (np.dot) and runs at
+    # the same memory-bound speed, but accumulates in float64; sdot's float32
+    # accumulator drifts by ~1e-4 over a five-minute clip.
+    sum_sq = 0.0
+    for i in range(n):
+        sum_sq += audio[i] * audio[i]
+    
+    # Scale to target level; silent audio is left as-is
+    scaling_factor = target_level / np.sqrt(sum_sq / n) if sum_sq > 0.0 else 1.0
     
-    return audio
+    # Clip to prevent values outside [-1, 1]. The clip is fused into the scale
+    # loop as SIMD min/max and costs the same as a bare multiply, so it is not
+    # worth skipping. Knowing when it could be skipped would need the peak,
+    # and a max-reduction doesn't vectorize here; tracking it in the loop
+    # above makes that pass ~7x slower.
+    for i in range(n):
+        out[i] = min(1.0, max(-1.0, audio[i] * scaling_factor))
+
+
+# Compile the float32 specialization at import rather than on the first request
+_normalize_kernel(np.zeros(1, dtype=np.float32), np.empty(1, dtype=np.float32), 0.3)
 
 
 def save_temp_wav(audio: np.ndarray, sr: int) -> str:
@@ -194,20 +337,6 @@ def save_temp_wav(audio: np.ndarray, sr: int) -> str:
     return temp_path
 
 
-def get_audio_duration(audio: np.ndarray, sr: int) -> float:
-    """
-    Calculate audio duration in seconds.
-    
-    Args:
-        audio: Audio array
-        sr: Sample rate
-        
-    Returns:
-        Duration in seconds
-    """
-    return len(audio) / sr
-
-
 def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
     """
     Resample audio to target sample rate.
@@ -222,5 +351,6 @@ def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarra
     """
     if orig_sr == target_sr:
         return audio
-        
-    return librosa.resample(audio, orig_sr=orig_sr, target_sr=target_sr)
+    
+    # Same libsoxr HQ filter librosa.resample defaults to, without the wrapper
+    return _soxr_resample(audio, orig_sr, target_sr, quality='HQ')
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone, timedelta
 from typing import Optional
 from fastapi import HTTPException, Request, Response
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.asynchronous.database import AsyncDatabase
 import httpx
 import os
 
@@ -9,7 +9,7 @@ import os
 EMERGENT_SESSION_API = "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"
 
 class AuthService:
-    def __init__(self, db: AsyncIOMotorClient):
+    def __init__(self, db: AsyncDatabase):
         self.db = db
     
     async def get_current_user(self, request: Request):
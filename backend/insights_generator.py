@@ -1,73 +1,101 @@
 """
 Insights generator: Translates technical acoustic metrics into user-friendly, personalized insights.
 """
+import math
+from bisect import bisect_left
+from functools import lru_cache
 from typing import Dict, List
 
 
+def _below(threshold: float) -> float:
+    """Largest float under `threshold`, for tiers where reaching it already moves up."""
+    return math.nextafter(threshold, -math.inf)
+
+
+# Threshold tables for the classifiers below. bisect_left(thresholds, value)
+# counts the thresholds strictly under `value`, i.e. the index of its tier.
+PITCH_LEVEL_THRESHOLDS = (_below(130), 200)
+PITCH_LEVELS = ("deeper voice", "medium pitch", "higher pitch")
+
+PITCH_VARIATION_THRESHOLDS = (25, 45)
+PITCH_VARIATIONS = ("steady tone", "natural melody", "rich melody that keeps listeners engaged")
+
+PACE_THRESHOLDS = (_below(120), 160)
+PACE_DESCRIPTIONS = (
+    ("thoughtful pace", "—giving listeners time to absorb your ideas"),
+    ("comfortable pace", "—easy for listeners to follow"),
+    ("quick pace", "—you cover a lot of ground fast"),
+)
+
+PAUSE_COUNT_THRESHOLDS = (5, 15)
+PAUSE_COUNT_TEMPLATES = (
+    " Consider adding more pauses for emphasis",
+    " Your {} pauses help punctuate your thoughts",
+    " You use {} pauses effectively",
+)
+
+ENERGY_THRESHOLDS = (8, 15)
+ENERGY_INSIGHTS = (
+    "Your volume is consistent—try adding more energy variation to emphasize important ideas",
+    "Your volume has good variation that helps maintain interest",
+    "Your energy is dynamic with great peaks and valleys that emphasize key points",
+)
+
+CLARITY_THRESHOLDS = (10, 15)
+CLARITY_INSIGHTS = (
+    "Your voice has natural quality with room to strengthen resonance",
+    "Your voice sounds clear and confident",
+    "Your voice quality is crystal clear and resonant with no shakiness",
+)
+
+PAUSE_LENGTH_THRESHOLDS = (_below(300), 700)
+PAUSE_LENGTH_TEMPLATES = (
+    "Your {pause_count} pauses are quick (averaging {mean_pause_ms:.0f}ms)—consider making them slightly longer for emphasis",
+    "You used {pause_count} well-timed pauses that make you sound thoughtful and confident",
+    "You used {pause_count} pauses (averaging {mean_pause_ms:.0f}ms)—quite thoughtful, though some feel a bit long",
+)
+
+FILLER_RATE_THRESHOLDS = (2, 5)
+FILLER_RATE_TEMPLATES = (
+    "You had minimal filler words ({filler_desc})—well done keeping your speech clean",
+    "You said {filler_desc}—just a few to work on. Pause instead, and your ideas will have more impact",
+    "You said {filler_desc}—that's {total_fillers} total fillers. Try replacing them with brief pauses for a more polished delivery",
+)
+
+TONE_ENERGY_THRESHOLDS = (_below(8), 12)
+TONE_ENERGY = ("calm", "balanced", "energetic")
+
+TONE_MELODY_THRESHOLDS = (_below(25), 40)
+TONE_MELODY = ("steady", None, "expressive")
+
+
 def generate_pitch_insight(pitch_mean: float, pitch_std: float, pitch_range: float) -> str:
     """Generate personalized insight about pitch/melody."""
     if pitch_mean == 0:
         return "Your voice has natural clarity"
     
-    # Classify pitch level
-    if pitch_mean > 200:
-        pitch_level = "higher pitch"
-    elif pitch_mean < 130:
-        pitch_level = "deeper voice"
-    else:
-        pitch_level = "medium pitch"
-    
-    # Classify variation
-    if pitch_std > 45:
-        variation = "rich melody that keeps listeners engaged"
-    elif pitch_std > 25:
-        variation = "natural melody"
-    else:
-        variation = "steady tone"
+    pitch_level = PITCH_LEVELS[bisect_left(PITCH_LEVEL_THRESHOLDS, pitch_mean)]
+    variation = PITCH_VARIATIONS[bisect_left(PITCH_VARIATION_THRESHOLDS, pitch_std)]
     
     return f"Your voice has a {pitch_level} with {variation}"
 
 
 def generate_pace_insight(wpm: int, pause_count: int, mean_pause_ms: float) -> str:
     """Generate personalized insight about speaking pace."""
-    if wpm > 160:
-        pace_desc = "quick pace"
-        advice = "—you cover a lot of ground fast"
-    elif wpm < 120:
-        pace_desc = "thoughtful pace"
-        advice = "—giving listeners time to absorb your ideas"
-    else:
-        pace_desc = "comfortable pace"
-        advice = "—easy for listeners to follow"
-    
-    if pause_count > 15:
-        pause_desc = f" You use {pause_count} pauses effectively"
-    elif pause_count > 5:
-        pause_desc = f" Your {pause_count} pauses help punctuate your thoughts"
-    else:
-        pause_desc = " Consider adding more pauses for emphasis"
+    pace_desc, advice = PACE_DESCRIPTIONS[bisect_left(PACE_THRESHOLDS, wpm)]
+    pause_desc = PAUSE_COUNT_TEMPLATES[bisect_left(PAUSE_COUNT_THRESHOLDS, pause_count)].format(pause_count)
     
     return f"You speak at a {pace_desc} ({wpm} words per minute){advice}.{pause_desc}"
 
 
 def generate_energy_insight(rms_mean: float, dynamic_range: float) -> str:
     """Generate personalized insight about energy and volume."""
-    if dynamic_range > 15:
-        return "Your energy is dynamic with great peaks and valleys that emphasize key points"
-    elif dynamic_range > 8:
-        return "Your volume has good variation that helps maintain interest"
-    else:
-        return "Your volume is consistent—try adding more energy variation to emphasize important ideas"
+    return ENERGY_INSIGHTS[bisect_left(ENERGY_THRESHOLDS, dynamic_range)]
 
 
 def generate_clarity_insight(jitter: float, shimmer: float, hnr: float) -> str:
     """Generate personalized insight about voice quality."""
-    if hnr > 15:
-        return "Your voice quality is crystal clear and resonant with no shakiness"
-    elif hnr > 10:
-        return "Your voice sounds clear and confident"
-    else:
-        return "Your voice has natural quality with room to strengthen resonance"
+    return CLARITY_INSIGHTS[bisect_left(CLARITY_THRESHOLDS, hnr)]
 
 
 def generate_pause_insight(pause_count: int, mean_pause_ms: float, long_pauses: List, duration: float) -> str:
@@ -77,12 +105,8 @@ def generate_pause_insight(pause_count: int, mean_pause_ms: float, long_pauses:
     
     pause_rate = pause_count / (duration / 60) if duration > 0 else 0
     
-    if mean_pause_ms > 700:
-        return f"You used {pause_count} pauses (averaging {mean_pause_ms:.0f}ms)—quite thoughtful, though some feel a bit long"
-    elif mean_pause_ms < 300:
-        return f"Your {pause_count} pauses are quick (averaging {mean_pause_ms:.0f}ms)—consider making them slightly longer for emphasis"
-    else:
-        return f"You used {pause_count} well-timed pauses that make you sound thoughtful and confident"
+    template = PAUSE_LENGTH_TEMPLATES[bisect_left(PAUSE_LENGTH_THRESHOLDS, mean_pause_ms)]
+    return template.format(pause_count=pause_count, mean_pause_ms=mean_pause_ms)
 
 
 def generate_filler_insight(filler_words: Dict, word_count: int) -> str:
@@ -97,12 +121,8 @@ def generate_filler_insight(filler_words: Dict, word_count: int) -> str:
     top_fillers = sorted(filler_words.items(), key=lambda x: x[1], reverse=True)[:2]
     filler_desc = " and ".join([f"'{k}' {v} times" for k, v in top_fillers])
     
-    if filler_rate > 5:
-        return f"You said {filler_desc}—that's {total_fillers} total fillers. Try replacing them with brief pauses for a more polished delivery"
-    elif filler_rate > 2:
-        return f"You said {filler_desc}—just a few to work on. Pause instead, and your ideas will have more impact"
-    else:
-        return f"You had minimal filler words ({filler_desc})—well done keeping your speech clean"
+    template = FILLER_RATE_TEMPLATES[bisect_left(FILLER_RATE_THRESHOLDS, filler_rate)]
+    return template.format(filler_desc=filler_desc, total_fillers=total_fillers)
 
 
 def classify_voice_personality(metrics: Dict) -> str:
@@ -112,11 +132,16 @@ def classify_voice_personality(metrics: Dict) -> str:
     timing = metrics.get("timing", {})
     pace = metrics.get("speaking_pace", 140)
     
-    pitch_std = prosody.get("pitch_std", 30)
-    dynamic_range = loudness.get("dynamic_range_db", 10)
-    silence_ratio = timing.get("silence_ratio", 0.3)
-    
-    # Classification logic
+    return _classify_personality(
+        prosody.get("pitch_std", 30),
+        loudness.get("dynamic_range_db", 10),
+        timing.get("silence_ratio", 0.3),
+        pace
+    )
+
+
+def _classify_personality(pitch_std: float, dynamic_range: float, silence_ratio: float, pace: float) -> str:
+    """Voice archetype from already-extracted metric values."""
     if pitch_std > 45 and dynamic_range > 12:
         return "Dynamic Storyteller"
     elif silence_ratio > 0.35 and pace < 130:
@@ -136,24 +161,25 @@ def generate_tone_description(metrics: Dict) -> str:
     prosody = metrics.get("prosody", {})
     loudness = metrics.get("loudness", {})
     
-    pitch_std = prosody.get("pitch_std", 30)
-    dynamic_range = loudness.get("dynamic_range_db", 10)
-    
-    descriptors = []
-    
-    # Energy level
-    if dynamic_range > 12:
-        descriptors.append("energetic")
-    elif dynamic_range < 8:
-        descriptors.append("calm")
-    else:
-        descriptors.append("balanced")
+    return _describe_tone(prosody.get("pitch_std", 30), loudness.get("dynamic_range_db", 10))
+
+
+def _describe_tone(pitch_std: float, dynamic_range: float) -> str:
+    """Tone description from already-extracted metric values."""
+    return _tone_description(
+        bisect_left(TONE_ENERGY_THRESHOLDS, dynamic_range),
+        bisect_left(TONE_MELODY_THRESHOLDS, pitch_std)
+    )
+
+
+@lru_cache(maxsize=None)
+def _tone_description(energy_tier: int, melody_tier: int) -> str:
+    """Build the tone description for an (energy, melody) tier pair; there are only nine."""
+    descriptors = [TONE_ENERGY[energy_tier]]
     
-    # Melody
-    if pitch_std > 40:
-        descriptors.append("expressive")
-    elif pitch_std < 25:
-        descriptors.append("steady")
+    melody = TONE_MELODY[melody_tier]
+    if melody:
+        descriptors.append(melody)
     
     # Always add positive ending
     descriptors.append("approachable")
@@ -180,17 +206,31 @@ def generate_personalized_summary(all_metrics: Dict) -> Dict:
     speaking_pace = all_metrics.get("speaking_pace", 0)
     duration = all_metrics.get("duration", 0)
     
+    # Read each metric once; the sections below share these values
+    pitch_mean = prosody.get("pitch_mean", 0)
+    pitch_std = prosody.get("pitch_std", 0)
+    dynamic_range = loudness.get("dynamic_range_db", 0)
+    hnr = quality.get("hnr_mean", 0)
+    pause_count = timing.get("pause_count", 0)
+    mean_pause_ms = timing.get("mean_pause_ms", 0)
+    total_fillers = sum(filler_words.values())
+    
     # Generate personality and tone
-    voice_personality = classify_voice_personality(all_metrics)
-    tone_description = generate_tone_description(all_metrics)
+    voice_personality = _classify_personality(
+        pitch_std,
+        dynamic_range,
+        timing.get("silence_ratio", 0.3),
+        speaking_pace
+    )
+    tone_description = _describe_tone(pitch_std, dynamic_range)
     
     # Generate key insights
     key_insights = []
     
     # Pitch insight
     pitch_insight = generate_pitch_insight(
-        prosody.get("pitch_mean", 0),
-        prosody.get("pitch_std", 0),
+        pitch_mean,
+        pitch_std,
         prosody.get("pitch_range_hz", 0)
     )
     if pitch_insight:
@@ -199,8 +239,8 @@ def generate_personalized_summary(all_metrics: Dict) -> Dict:
     # Pace insight
     pace_insight = generate_pace_insight(
         speaking_pace,
-        timing.get("pause_count", 0),
-        timing.get("mean_pause_ms", 0)
+        pause_count,
+        mean_pause_ms
     )
     if pace_insight:
         key_insights.append(pace_insight)
@@ -208,7 +248,7 @@ def generate_personalized_summary(all_metrics: Dict) -> Dict:
     # Energy insight
     energy_insight = generate_energy_insight(
         loudness.get("rms_mean", 0),
-        loudness.get("dynamic_range_db", 0)
+        dynamic_range
     )
     if energy_insight:
         key_insights.append(energy_insight)
@@ -223,10 +263,10 @@ def generate_personalized_summary(all_metrics: Dict) -> Dict:
         key_insights.append(clarity_insight)
     
     # Pause insight
-    if timing.get("pause_count", 0) > 0:
+    if pause_count > 0:
         pause_insight = generate_pause_insight(
-            timing.get("pause_count", 0),
-            timing.get("mean_pause_ms", 0),
+            pause_count,
+            mean_pause_ms,
             timing.get("long_pauses", []),
             duration
         )
@@ -242,33 +282,32 @@ def generate_personalized_summary(all_metrics: Dict) -> Dict:
     # Generate strengths
     what_went_well = []
     
-    if quality.get("hnr_mean", 0) > 15:
+    if hnr > 15:
         what_went_well.append("Your voice quality is crystal clear with excellent resonance")
     
-    if timing.get("pause_count", 0) > 5 and timing.get("mean_pause_ms", 0) > 300:
-        what_went_well.append(f"You used {timing['pause_count']} well-timed pauses that show confidence")
+    if pause_count > 5 and mean_pause_ms > 300:
+        what_went_well.append(f"You used {pause_count} well-timed pauses that show confidence")
     
-    if loudness.get("dynamic_range_db", 0) > 10:
+    if dynamic_range > 10:
         what_went_well.append("Your energy variation keeps listeners engaged")
     
-    if prosody.get("pitch_std", 0) > 35:
+    if pitch_std > 35:
         what_went_well.append("Your vocal melody is naturally expressive")
     
-    if sum(filler_words.values()) < 5:
+    if total_fillers < 5:
         what_went_well.append("You kept filler words to a minimum")
     
     # Generate growth opportunities
     growth_opportunities = []
     
-    total_fillers = sum(filler_words.values())
     if total_fillers > 5:
-        top_filler = max(filler_words.items(), key=lambda x: x[1])[0]
+        top_filler = max(filler_words, key=filler_words.get)
         growth_opportunities.append(f"Replace those {total_fillers} filler words (especially '{top_filler}') with brief pauses")
     
-    if loudness.get("dynamic_range_db", 0) < 8:
+    if dynamic_range < 8:
         growth_opportunities.append("Add more volume variation to emphasize your key points")
     
-    if timing.get("pause_count", 0) < 5:
+    if pause_count < 5:
         growth_opportunities.append("Use more strategic pauses to let your ideas breathe")
     
     if speaking_pace > 160:
@@ -278,9 +317,9 @@ def generate_personalized_summary(all_metrics: Dict) -> Dict:
     
     # Generate headline
     headline = f"Your voice is {tone_description.lower()}"
-    if prosody.get("pitch_std", 0) > 35:
+    if pitch_std > 35:
         headline += " with natural energy that draws listeners in"
-    elif quality.get("hnr_mean", 0) > 15:
+    elif hnr > 15:
         headline += " with excellent clarity and confidence"
     else:
         headline += " with room to add more dynamic energy"
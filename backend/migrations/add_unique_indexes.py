@@ -1,5 +1,6 @@
 """
-Migration script to add unique indexes to prevent duplicate users and sessions.
+Migration script to add unique indexes to prevent duplicate users and sessions,
+plus the assessments index used for plan usage counts.
 Run this once to set up the database constraints.
 
 Usage:
@@ -7,15 +8,39 @@ Usage:
 """
 import asyncio
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient, IndexModel, ASCENDING, DESCENDING
 from dotenv import load_dotenv
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
 
+USERS_INDEXES = [
+    # Unique index on users.email
+    IndexModel("email", unique=True, name="unique_email"),
+    # Unique index on users.id
+    IndexModel("id", unique=True, name="unique_user_id"),
+]
+
+USER_SESSIONS_INDEXES = [
+    # Unique index on user_sessions.session_token
+    IndexModel("session_token", unique=True, name="unique_session_token"),
+    # Index on user_sessions.user_id for faster lookups
+    IndexModel("user_id", name="idx_user_id"),
+    # TTL index on user_sessions.expires_at to auto-delete expired sessions
+    IndexModel("expires_at", expireAfterSeconds=0, name="ttl_expires_at"),
+]
+
+ASSESSMENTS_INDEXES = [
+    # Compound index for usage counts; must match usage.USAGE_INDEX_KEYS/NAME
+    IndexModel(
+        [("user_id", ASCENDING), ("created_at", DESCENDING)],
+        name="idx_user_id_created_at"
+    ),
+]
+
 async def create_unique_indexes():
-    """Create unique indexes on users and user_sessions collections."""
+    """Create unique indexes on users and user_sessions, and the assessments usage index."""
     mongo_url = os.environ.get('MONGO_URL')
     db_name = os.environ.get('DB_NAME')
     
@@ -23,43 +48,43 @@ async def create_unique_indexes():
         print("ERROR: MONGO_URL and DB_NAME environment variables must be set")
         return
     
-    client = AsyncIOMotorClient(mongo_url)
+    client = AsyncMongoClient(mongo_url)
     db = client[db_name]
     
     try:
-        # Create unique index on users.email
-        print("Creating unique index on users.email...")
-        await db.users.create_index("email", unique=True, name="unique_email")
-        print("✓ Unique index on users.email created")
-        
-        # Create unique index on users.id
-        print("Creating unique index on users.id...")
-        await db.users.create_index("id", unique=True, name="unique_user_id")
-        print("✓ Unique index on users.id created")
-        
-        # Create unique index on user_sessions.session_token
-        print("Creating unique index on user_sessions.session_token...")
-        await db.user_sessions.create_index("session_token", unique=True, name="unique_session_token")
-        print("✓ Unique index on user_sessions.session_token created")
+        # Send every index build at once. Each index is its own command so a
+        # failure on one (e.g. existing duplicate emails) doesn't abort or hide
+        # the others; results are reported per index.
+        specs = [(db.users, model) for model in USERS_INDEXES]
+        specs += [(db.user_sessions, model) for model in USER_SESSIONS_INDEXES]
+        specs += [(db.assessments, model) for model in ASSESSMENTS_INDEXES]
         
-        # Create index on user_sessions.user_id for faster lookups
-        print("Creating index on user_sessions.user_id...")
-        await db.user_sessions.create_index("user_id", name="idx_user_id")
-        print("✓ Index on user_sessions.user_id created")
+        print(f"Creating {len(specs)} indexes on users, user_sessions and assessments...")
+        results = await asyncio.gather(
+            *(collection.create_indexes([model]) for collection, model in specs),
+            return_exceptions=True
+        )
         
-        # Create TTL index on user_sessions.expires_at to auto-delete expired sessions
-        print("Creating TTL index on user_sessions.expires_at...")
-        await db.user_sessions.create_index("expires_at", expireAfterSeconds=0, name="ttl_expires_at")
-        print("✓ TTL index on user_sessions.expires_at created")
+        failures = 0
+        for (collection, model), result in zip(specs, results):
+            index_name = f"{collection.name}.{model.document['name']}"
+            if isinstance(result, Exception):
+                failures += 1
+                print(f"✗ Failed to create index {index_name}: {result}")
+            else:
+                print(f"✓ Index {index_name} created")
         
-        print("\n✅ All indexes created successfully!")
+        if failures:
+            print(f"\n❌ {failures} of {len(specs)} indexes could not be created")
+            print("\nThe indexes listed above do not exist. A 'duplicate key error' means")
+            print("existing documents violate the unique constraint; fix them and re-run.")
+        else:
+            print("\n✅ All indexes created successfully!")
         
     except Exception as e:
         print(f"\n❌ Error creating indexes: {e}")
-        print("\nNote: If you see 'duplicate key error', some indexes may already exist.")
-        print("This is safe to ignore - the indexes are already in place.")
     finally:
-        client.close()
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(create_unique_indexes())
@@ -18,36 +18,8 @@ Your role:
 Tone: Supportive, specific, conversational, expert but approachable. Write like you're having a one-on-one coaching session."""
 
 
-def build_gpt_analysis_prompt(transcription: str, acoustic_metrics: Dict, duration: float) -> str:
-    """
-    Build comprehensive GPT prompt that combines transcript analysis with acoustic metrics.
-    
-    Args:
-        transcription: Full text transcription
-        acoustic_metrics: All acoustic features and metrics
-        duration: Recording duration in seconds
-        
-    Returns:
-        Complete prompt string for GPT-4
-    """
-    prosody = acoustic_metrics.get("prosody", {})
-    loudness = acoustic_metrics.get("loudness", {})
-    quality = acoustic_metrics.get("quality", {})
-    timing = acoustic_metrics.get("timing", {})
-    fillers = acoustic_metrics.get("filler_words", {})
-    pace = acoustic_metrics.get("speaking_pace", 0)
-    
-    # Build contextual observations in natural language
-    pitch_note = _describe_pitch(prosody)
-    energy_note = _describe_energy(loudness)
-    clarity_note = _describe_clarity(quality)
-    pause_note = _describe_pauses(timing)
-    filler_note = _describe_fillers(fillers)
-    
-    # Truncate transcript if too long (keep it manageable for GPT)
-    transcript_excerpt = transcription[:800] + "..." if len(transcription) > 800 else transcription
-    
-    prompt = f"""Analyze this voice recording and provide personalized coaching feedback.
+# Static body of the analysis prompt; only the observation slots change per call
+ANALYSIS_PROMPT_TEMPLATE = """Analyze this voice recording and provide personalized coaching feedback.
 
 **What they said:**
 "{transcript_excerpt}"
@@ -96,8 +68,46 @@ Provide warm, personalized feedback in JSON format with these exact fields:
 "Before your next call, take 3 deep breaths and remind yourself: pauses are powerful. They're not awkward—they're professional."
 
 Now analyze this speaker's voice and provide your personalized coaching feedback in the JSON format above."""
+
+
+def build_gpt_analysis_prompt(transcription: str, acoustic_metrics: Dict, duration: float) -> str:
+    """
+    Build comprehensive GPT prompt that combines transcript analysis with acoustic metrics.
+    
+    Args:
+        transcription: Full text transcription
+        acoustic_metrics: All acoustic features and metrics
+        duration: Recording duration in seconds
+        
+    Returns:
+        Complete prompt string for GPT-4
+    """
+    prosody = acoustic_metrics.get("prosody", {})
+    loudness = acoustic_metrics.get("loudness", {})
+    quality = acoustic_metrics.get("quality", {})
+    timing = acoustic_metrics.get("timing", {})
+    fillers = acoustic_metrics.get("filler_words", {})
+    pace = acoustic_metrics.get("speaking_pace", 0)
+    
+    # Build contextual observations in natural language
+    pitch_note = _describe_pitch(prosody)
+    energy_note = _describe_energy(loudness)
+    clarity_note = _describe_clarity(quality)
+    pause_note = _describe_pauses(timing)
+    filler_note = _describe_fillers(fillers)
+    
+    # Truncate transcript if too long (keep it manageable for GPT)
+    transcript_excerpt = transcription[:800] + "..." if len(transcription) > 800 else transcription
     
-    return prompt
+    return ANALYSIS_PROMPT_TEMPLATE.format(
+        transcript_excerpt=transcript_excerpt,
+        pace=pace,
+        pitch_note=pitch_note,
+        energy_note=energy_note,
+        clarity_note=clarity_note,
+        pause_note=pause_note,
+        filler_note=filler_note
+    )
 
 
 def _describe_pitch(prosody: Dict) -> str:
@@ -1,8 +1,9 @@
 from fastapi import FastAPI, APIRouter, File, UploadFile, Form, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 import uvicorn
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import AsyncMongoClient
 import os
 import tempfile
 import logging
@@ -44,7 +45,16 @@ load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# Keep a warm pool so bursts reuse sockets instead of paying a TCP+TLS
+# handshake per query, and fail fast rather than queueing when it's exhausted
+client = AsyncMongoClient(
+    mongo_url,
+    maxPoolSize=50,
+    minPoolSize=10,
+    maxIdleTimeMS=300000,
+    waitQueueTimeoutMS=2000,
+    retryWrites=True
+)
 db = client[os.environ['DB_NAME']]
 
 # OpenAI clients
@@ -60,13 +70,17 @@ openai_text_client = OpenAI(
 
 # Initialize services
 auth_service = AuthService(db)
-usage_service = UsageService(db)
+usage_service = UsageService(
+    db,
+    use_counters=os.environ.get('USAGE_COUNTERS_ENABLED', 'false').lower() == 'true'
+)
 
 # Initialize Rate Limiter
 limiter = Limiter(key_func=get_remote_address)
 
-# Create the main app without a prefix
-app = FastAPI()
+# Create the main app without a prefix. Responses are encoded with orjson
+# rather than stdlib json.
+app = FastAPI(default_response_class=ORJSONResponse)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -294,13 +308,21 @@ async def analyze_voice(request: Request, request_data: VoiceAnalysisRequest):
         await db.assessments.insert_one(assessment)
         logger.info("Initial assessment saved to database")
         
+        # Track usage as soon as the assessment exists, matching what a count
+        # of the assessments collection would see
+        try:
+            await usage_service.track_analysis(user_id)
+        except Exception as usage_error:
+            logger.error(f"Failed to track usage: {usage_error}")
+            # Don't fail the request for usage tracking failures
+        
         # Process audio
         try:
             # ===== ACOUSTIC ANALYSIS PIPELINE =====
             # 1. Load audio from base64
             logger.info("Step 1: Loading audio from base64...")
             audio, sr = audio_utils.load_audio_from_base64(request_data.audio_base64, target_sr=16000)
-            duration = audio_utils.get_audio_duration(audio, sr)
+            duration = len(audio) / sr
             logger.info(f"Audio loaded: duration={duration:.2f}s, sample_rate={sr}")
             
             # 2. Voice Activity Detection and timing analysis
@@ -493,15 +515,6 @@ async def analyze_voice(request: Request, request_data: VoiceAnalysisRequest):
                 logger.error(f"Failed to generate training questions: {tq_error}")
                 # Don't fail the main request - training questions are non-critical
             
-            # Track usage for this analysis
-            logger.info("Step 14: Tracking usage...")
-            try:
-                await usage_service.track_analysis(user_id)
-                logger.info(f"Usage tracked for user {user_id}")
-            except Exception as usage_error:
-                logger.error(f"Failed to track usage: {usage_error}")
-                # Don't fail the request for usage tracking failures
-            
             logger.info("========== ANALYZE-VOICE COMPLETED SUCCESSFULLY ==========")
             logger.info(f"Returning assessment_id: {assessment_id}")
             return VoiceAnalysisResponse(
@@ -734,8 +747,7 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     """
     logger.warning(f"HTTPException {exc.status_code} on {request.method} {request.url.path}: {exc.detail}")
     # Let FastAPI handle the response normally
-    from fastapi.responses import JSONResponse
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=exc.status_code,
         content={"detail": exc.detail} if isinstance(exc.detail, str) else exc.detail
     )
@@ -747,15 +759,22 @@ async def global_exception_handler(request: Request, exc: Exception):
     """
     import traceback
     logger.error(f"Unhandled exception on {request.method} {request.url.path}: {str(exc)}\n{traceback.format_exc()}")
-    from fastapi.responses import JSONResponse
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=500,
         content={"detail": f"Internal server error: {str(exc)}"}
     )
 
+@app.on_event("startup")
+async def create_usage_indexes():
+    # Usage counts hint this index, so make sure it exists before serving
+    try:
+        await usage_service.ensure_indexes()
+    except Exception as e:
+        logger.error(f"Failed to create usage indexes: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
+    await client.close()
 
 
 if __name__ == "__main__":
@@ -30,6 +30,11 @@ class TestGeneratePitchInsight:
         result = insights_generator.generate_pitch_insight(100, 30, 50)
         assert "deeper voice" in result.lower()
     
+    def test_threshold_boundaries_are_medium(self):
+        """Should treat exactly 130 Hz and 200 Hz as medium pitch"""
+        assert "medium pitch" in insights_generator.generate_pitch_insight(130, 30, 50)
+        assert "medium pitch" in insights_generator.generate_pitch_insight(200, 30, 50)
+    
     def test_high_variation(self):
         """Should describe high pitch variation (std > 45)"""
         result = insights_generator.generate_pitch_insight(150, 50, 100)
@@ -73,6 +78,15 @@ class TestGenerateFillerInsight:
         result = insights_generator.generate_filler_insight({"um": 10, "like": 3}, 200)
         assert "um" in result.lower()
 
+    def test_rate_boundaries(self):
+        """Should only escalate once the filler rate is above 2% and 5%"""
+        at_two = insights_generator.generate_filler_insight({"um": 2}, 100)
+        at_five = insights_generator.generate_filler_insight({"um": 5}, 100)
+        above_five = insights_generator.generate_filler_insight({"um": 6}, 100)
+        assert "minimal" in at_two
+        assert "just a few" in at_five
+        assert "6 total fillers" in above_five
+
 
 class TestClassifyVoicePersonality:
     """Tests for classify_voice_personality function"""
@@ -0,0 +1,454 @@
+"""
+Tests for usage module.
+
+Run with: pytest tests/test_usage.py -v
+"""
+import pytest
+import os
+import sys
+import time
+from unittest.mock import patch, MagicMock, AsyncMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import usage
+
+
+def make_service(use_counters=False):
+    """UsageService over mocked primary and secondary-preferred collections"""
+    db = MagicMock()
+    db.users.with_options.return_value = MagicMock()
+    db.assessments.with_options.return_value = MagicMock()
+    service = usage.UsageService(db, use_counters=use_counters)
+    db.reset_mock()  # Forget the with_options calls made while constructing
+    return service
+
+
+def cursor(docs):
+    """Mock async cursor returning `docs`"""
+    c = MagicMock()
+    c.to_list = AsyncMock(return_value=docs)
+    return c
+
+
+def prime_cache(service, user_id, loaded):
+    """Cache `loaded` (is_premium, monthly, total) as this month's usage"""
+    month, _ = usage.current_month()
+    service._cache[user_id] = (time.monotonic() + 60, month, loaded)
+
+
+class TestCountUsage:
+    """Tests for UsageService._count_usage"""
+
+    @pytest.mark.asyncio
+    async def test_pipeline_shape(self):
+        """Should fetch the plan flag and both counts in one users aggregation"""
+        service = make_service()
+        service.users_ro.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": True, "monthly": 2, "total": 9}])
+        )
+        _, start_of_month = usage.current_month()
+
+        result = await service._count_usage("u1", start_of_month)
+
+        assert result == (True, 2, 9)
+        pipeline = service.users_ro.aggregate.call_args.args[0]
+        assert pipeline[0] == {"$match": {"id": "u1"}}
+        assert pipeline[1] is usage._PLAN_FLAG_PROJECTION
+        assert pipeline[2] == usage._usage_lookup_stage(start_of_month)
+        lookup = pipeline[2]["$lookup"]
+        assert (lookup["from"], lookup["localField"], lookup["foreignField"]) == (
+            "assessments", "id", "user_id"
+        )
+        assert pipeline[3] is usage._COUNTS_PROJECTION
+
+    @pytest.mark.asyncio
+    async def test_unknown_user_raises_404(self):
+        """Should raise a 404 when the user doesn't exist"""
+        from fastapi import HTTPException
+        service = make_service()
+        service.users_ro.aggregate = AsyncMock(return_value=cursor([]))
+        _, start_of_month = usage.current_month()
+
+        with pytest.raises(HTTPException) as exc_info:
+            await service._count_usage("missing", start_of_month)
+        assert exc_info.value.status_code == 404
+
+
+class TestUsageCache:
+    """Tests for the in-process usage cache"""
+
+    @pytest.mark.asyncio
+    async def test_serves_cached_usage(self):
+        """Should answer from the cache without a database read"""
+        service = make_service()
+        prime_cache(service, "u1", (False, 1, 4))
+
+        result = await service.get_user_usage("u1")
+
+        assert result["total_assessments"] == 4
+        assert not service.users_ro.mock_calls
+
+    @pytest.mark.asyncio
+    async def test_expired_entry_is_reloaded_and_dropped(self):
+        """Should reload expired usage instead of serving it"""
+        service = make_service()
+        month, _ = usage.current_month()
+        service._cache["u1"] = (time.monotonic() - 1, month, (False, 1, 4))
+        service.users_ro.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": False, "monthly": 2, "total": 5}])
+        )
+
+        result = await service.get_user_usage("u1")
+
+        assert result["total_assessments"] == 5
+
+    @pytest.mark.asyncio
+    async def test_evicts_least_recently_used(self):
+        """Should keep at most USAGE_CACHE_MAX_ENTRIES users"""
+        service = make_service()
+        service.users_ro.aggregate = AsyncMock(
+            side_effect=lambda pipeline: cursor([{"isPremium": False, "monthly": 0, "total": 0}])
+        )
+
+        with patch('usage.USAGE_CACHE_MAX_ENTRIES', 2):
+            for user_id in ("a", "b", "c"):
+                await service.get_user_usage(user_id)
+
+        assert list(service._cache) == ["b", "c"]
+
+
+class TestCounters:
+    """Tests for counters mode (use_counters=True)"""
+
+    @pytest.mark.asyncio
+    async def test_reads_current_period_counters(self):
+        """Should read usage from the counters on the user document"""
+        service = make_service(use_counters=True)
+        month, _ = usage.current_month()
+        service.users_ro.find_one = AsyncMock(return_value={
+            "isPremium": True, "usage_total": 40, "usage_monthly": 12, "usage_period": month
+        })
+
+        result = await service.get_user_usage("u1")
+
+        assert result["used"] == 12
+        assert result["total_assessments"] == 40
+        assert not service.users_ro.aggregate.called
+
+    @pytest.mark.asyncio
+    async def test_stale_period_reads_as_zero(self):
+        """Should report no monthly usage when the stored period has rolled over"""
+        service = make_service(use_counters=True)
+        service.users_ro.find_one = AsyncMock(return_value={
+            "isPremium": True, "usage_total": 40, "usage_monthly": 12, "usage_period": "2000-01"
+        })
+
+        result = await service.get_user_usage("u1")
+
+        assert result["used"] == 0
+        assert result["total_assessments"] == 40
+
+    @pytest.mark.asyncio
+    async def test_unseeded_user_seeded_from_primary_count(self):
+        """Should count on the primary and store the result for users without counters"""
+        service = make_service(use_counters=True)
+        service.users_ro.find_one = AsyncMock(return_value={"isPremium": False})
+        service.db.users.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": False, "monthly": 2, "total": 6}])
+        )
+        service.db.users.update_one = AsyncMock()
+
+        result = await service.get_user_usage("u1")
+
+        assert result["total_assessments"] == 6
+        seed = service.db.users.update_one.call_args.args[1][0]["$set"]
+        assert seed["usage_total"] == {"$max": [{"$ifNull": ["$usage_total", 0]}, 6]}
+
+    @pytest.mark.asyncio
+    async def test_track_increments_counters(self):
+        """Should increment seeded counters in one update and drop cached usage"""
+        service = make_service(use_counters=True)
+        service.db.users.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        prime_cache(service, "u1", (False, 1, 5))
+
+        await service.track_analysis("u1")
+
+        service.db.users.update_one.assert_awaited_once()
+        assert not service.db.users.aggregate.called
+        assert "u1" not in service._cache
+
+    @pytest.mark.asyncio
+    async def test_unseeded_increment_seeds_from_count(self):
+        """Should seed counters from a primary count when the increment matches nothing"""
+        service = make_service(use_counters=True)
+        service.db.users.update_one = AsyncMock(return_value=MagicMock(matched_count=0))
+        service.db.users.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": False, "monthly": 2, "total": 6}])
+        )
+
+        await service.track_analysis("u1")
+
+        assert service.db.users.update_one.await_count == 2
+        seed = service.db.users.update_one.call_args.args[1][0]["$set"]
+        assert seed["usage_total"] == {"$max": [{"$ifNull": ["$usage_total", 0]}, 6]}
+
+    @pytest.mark.asyncio
+    async def test_track_without_counters_only_invalidates(self):
+        """Should only drop cached usage when counters are off"""
+        service = make_service()
+        prime_cache(service, "u1", (False, 1, 1))
+
+        await service.track_analysis("u1")
+
+        assert "u1" not in service._cache
+        assert not service.db.mock_calls
+
+    @pytest.mark.asyncio
+    async def test_cached_allow_rereads_counters(self):
+        """Should confirm a cached allow from the counters for either plan, without probing"""
+        month, _ = usage.current_month()
+        for is_premium, stored_total in ((False, 500), (True, 45)):
+            service = make_service(use_counters=True)
+            prime_cache(service, "u1", (is_premium, 3, 3))
+            service.users_ro.find_one = AsyncMock(return_value={
+                "isPremium": is_premium, "usage_total": stored_total,
+                "usage_monthly": 30, "usage_period": month
+            })
+
+            result = await service.check_can_create_assessment("u1")
+
+            assert result["allowed"] is False
+            service.users_ro.find_one.assert_awaited_once()
+            assert not service.assessments_ro.mock_calls
+
+    @pytest.mark.asyncio
+    async def test_cached_denial_stands(self):
+        """Should deny from cache without re-reading the counters"""
+        service = make_service(use_counters=True)
+        prime_cache(service, "u1", (False, 0, 500))
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is False
+        assert not service.users_ro.mock_calls
+
+
+class TestCheckMany:
+    """Tests for UsageService.check_many"""
+
+    @pytest.mark.asyncio
+    async def test_checks_each_existing_user(self):
+        """Should check every found user and leave out missing ones"""
+        service = make_service()
+        service.users_ro.find = MagicMock(return_value=cursor([
+            {"id": "a", "isPremium": False},
+            {"id": "b", "isPremium": True},
+        ]))
+        service.assessments_ro.aggregate = AsyncMock(return_value=cursor([
+            {"_id": "b", "monthly": 30, "total": 31},
+        ]))
+
+        results = await service.check_many(["a", "b", "missing"])
+
+        assert set(results) == {"a", "b"}
+        assert results["a"]["allowed"] is True
+        assert results["a"]["usage"]["used"] == 0
+        assert results["b"]["allowed"] is False
+
+    @pytest.mark.asyncio
+    async def test_counts_from_index_fields_only(self):
+        """Should group counts over user_id and created_at only, hinting the usage index"""
+        service = make_service()
+        service.users_ro.find = MagicMock(return_value=cursor([]))
+        service.assessments_ro.aggregate = AsyncMock(return_value=cursor([]))
+
+        await service.check_many(["a"])
+
+        pipeline = service.assessments_ro.aggregate.call_args.args[0]
+        assert pipeline[0] == {"$match": {"user_id": {"$in": ["a"]}}}
+        assert pipeline[1] == {"$project": {"_id": 0, "user_id": 1, "created_at": 1}}
+        assert pipeline[2]["$group"]["_id"] == "$user_id"
+        hint = service.assessments_ro.aggregate.call_args.kwargs["hint"]
+        assert hint == {"user_id": 1, "created_at": -1}
+
+
+class TestCheckCanCreateAssessment:
+    """Tests for UsageService.check_can_create_assessment"""
+
+    @pytest.mark.asyncio
+    async def test_cached_denial_stands(self):
+        """Should deny from cache without touching the database"""
+        service = make_service()
+        prime_cache(service, "u1", (True, 30, 30))
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is False
+        assert not service.db.mock_calls
+        assert not service.assessments_ro.mock_calls
+
+    @pytest.mark.asyncio
+    async def test_cached_allow_confirmed_by_probe(self):
+        """Should confirm a cached allow with the bounded probe on a secondary"""
+        service = make_service()
+        prime_cache(service, "u1", (True, 3, 3))
+        service.assessments_ro.find_one = AsyncMock(return_value=None)
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is True
+        query = service.assessments_ro.find_one.call_args.args[0]
+        kwargs = service.assessments_ro.find_one.call_args.kwargs
+        assert "created_at" in query
+        assert kwargs["skip"] == 29
+        assert kwargs["hint"] == {"user_id": 1, "created_at": -1}
+
+    @pytest.mark.asyncio
+    async def test_free_probe_checks_lifetime_total(self):
+        """Should probe free users' total rather than this month's assessments"""
+        service = make_service()
+        prime_cache(service, "u1", (False, 3, 3))
+        service.assessments_ro.find_one = AsyncMock(return_value=None)
+
+        await service.check_can_create_assessment("u1")
+
+        query = service.assessments_ro.find_one.call_args.args[0]
+        assert query == {"user_id": "u1"}
+        assert service.assessments_ro.find_one.call_args.kwargs["skip"] == 499
+
+    @pytest.mark.asyncio
+    async def test_probe_hit_reloads_from_primary(self):
+        """Should reload from the primary when the probe finds the limit"""
+        service = make_service()
+        prime_cache(service, "u1", (True, 3, 3))
+        service.assessments_ro.find_one = AsyncMock(return_value={"created_at": 1})
+        service.db.users.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": True, "monthly": 30, "total": 30}])
+        )
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is False
+        service.db.users.aggregate.assert_awaited_once()
+
+
+class TestCheckResult:
+    """Tests for UsageService._check_result"""
+
+    def test_monthly_limit_reason(self):
+        """Should deny standard users at the monthly limit with the monthly reason"""
+        result = make_service()._check_result(True, 30, 45)
+        assert result["allowed"] is False
+        assert result["reason"] == (
+            "You've reached your standard plan limit of 30 assessments per month. "
+            "Please upgrade to continue."
+        )
+        assert result["usage"] == {"used": 30, "limit": 30, "plan": "standard"}
+
+    def test_total_limit_reason(self):
+        """Should deny free users at the total limit with the total reason"""
+        result = make_service()._check_result(False, 0, 500)
+        assert result["allowed"] is False
+        assert result["reason"] == (
+            "You've reached your free plan limit of 500 assessments. "
+            "Please upgrade to continue."
+        )
+
+    def test_allows_under_limit(self):
+        """Should allow with an empty reason below the limit"""
+        result = make_service()._check_result(False, 3, 3)
+        assert result == {
+            "allowed": True,
+            "reason": "",
+            "usage": {"used": 3, "limit": 500, "plan": "free"}
+        }
+
+
+class TestGetUserUsage:
+    """Tests for UsageService.get_user_usage"""
+
+    @pytest.mark.asyncio
+    async def test_same_shape_for_every_plan(self):
+        """Should return the same keys for free and standard users"""
+        service = make_service()
+        prime_cache(service, "free-user", (False, 2, 7))
+        prime_cache(service, "paid-user", (True, 4, 90))
+
+        free = await service.get_user_usage("free-user")
+        paid = await service.get_user_usage("paid-user")
+
+        assert free == {"plan": "free", "used": 7, "limit": 500,
+                        "total_assessments": 7, "remaining": 493}
+        assert paid == {"plan": "standard", "used": 4, "limit": 30,
+                        "total_assessments": 90, "remaining": 26}
+
+    @pytest.mark.asyncio
+    async def test_remaining_never_negative(self):
+        """Should report zero remaining for users over their limit"""
+        service = make_service()
+        prime_cache(service, "u1", (True, 35, 35))
+        assert (await service.get_user_usage("u1"))["remaining"] == 0
+
+
+class TestPrimaryRecheck:
+    """Tests for confirming secondary reads on the primary near the limit"""
+
+    @pytest.mark.asyncio
+    async def test_near_limit_allow_rechecked_on_primary(self):
+        """Should re-read from the primary when a secondary allow is near the limit"""
+        service = make_service()
+        service.users_ro.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": True, "monthly": 29, "total": 29}])
+        )
+        service.db.users.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": True, "monthly": 30, "total": 30}])
+        )
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is False
+        service.db.users.aggregate.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_far_from_limit_stays_on_secondary(self):
+        """Should not touch the primary when usage is well under the limit"""
+        service = make_service()
+        service.users_ro.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": True, "monthly": 3, "total": 3}])
+        )
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is True
+        assert not service.db.users.aggregate.called
+
+    @pytest.mark.asyncio
+    async def test_secondary_denial_not_rechecked(self):
+        """Should trust a denial from a secondary, since lag only under-counts"""
+        service = make_service()
+        service.users_ro.aggregate = AsyncMock(
+            return_value=cursor([{"isPremium": True, "monthly": 30, "total": 30}])
+        )
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is False
+        assert not service.db.users.aggregate.called
+
+    @pytest.mark.asyncio
+    async def test_near_limit_cached_allow_probes_primary(self):
+        """Should run the cached-allow probe on the primary near the limit"""
+        service = make_service()
+        prime_cache(service, "u1", (True, 29, 29))
+        service.db.assessments.find_one = AsyncMock(return_value=None)
+
+        result = await service.check_can_create_assessment("u1")
+
+        assert result["allowed"] is True
+        service.db.assessments.find_one.assert_awaited_once()
+        assert not service.assessments_ro.mock_calls
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,6 +1,112 @@
+import asyncio
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Dict, List, NamedTuple, Tuple
 from fastapi import HTTPException
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReadPreference
+from pymongo.asynchronous.database import AsyncDatabase
+
+# Compound index every usage count runs against: an equality on user_id
+# followed by a range on created_at, so a user's assessments are found with
+# an index scan rather than a collection scan. Top-level assessment queries hint it
+# by key pattern so mongod skips plan selection. Any index on these keys
+# satisfies the hint whatever its name, so one created under a different name
+# before ensure_indexes/migrations/add_unique_indexes.py ran still works.
+USAGE_INDEX_KEYS = [("user_id", ASCENDING), ("created_at", DESCENDING)]
+USAGE_INDEX_NAME = "idx_user_id_created_at"
+# Key document for hints; aggregate() sends its hint as-is, so it must be a
+# document rather than a list of pairs
+USAGE_INDEX_HINT = dict(USAGE_INDEX_KEYS)
+
+# How long a user's loaded usage is served from memory. Assessments created
+# through this process invalidate immediately; ones created by another worker
+# show up within this window.
+USAGE_CACHE_TTL_SECONDS = 60
+# Most users kept in that cache; the least recently used are evicted first
+USAGE_CACHE_MAX_ENTRIES = 10000
+
+# Usage reads go to a secondary when one is available. A lagging secondary
+# can only under-count, so an allow at or above this fraction of the plan
+# limit is re-read from the primary before it is trusted.
+PRIMARY_RECHECK_RATIO = 0.95
+
+
+class PlanSpec(NamedTuple):
+    """Assessment limit for a subscription plan"""
+    max_assessments: int
+    is_monthly: bool  # Limit resets monthly rather than applying to the total
+    name: str
+
+
+PLANS = {
+    "free": PlanSpec(max_assessments=500, is_monthly=False, name="free"),
+    "standard": PlanSpec(max_assessments=30, is_monthly=True, name="standard"),
+}
+
+# Plan for a user, indexed directly by their isPremium flag
+_PLANS_BY_BOOL = (PLANS["free"], PLANS["standard"])
+
+
+@lru_cache(maxsize=2)
+def _month(year: int, month: int) -> Tuple[str, datetime]:
+    """Period key ("YYYY-MM") and UTC start of a month; only changes monthly."""
+    return f"{year:04d}-{month:02d}", datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def current_month() -> Tuple[str, datetime]:
+    """Period key and start of the current UTC month."""
+    now = datetime.now(timezone.utc)
+    return _month(now.year, now.month)
+
+
+# Limit-reached messages, picked by PlanSpec.is_monthly
+_REASON_MONTHLY = "You've reached your {plan} plan limit of {limit} assessments per month. Please upgrade to continue."
+_REASON_TOTAL = "You've reached your {plan} plan limit of {limit} assessments. Please upgrade to continue."
+
+# Aggregation stages that don't depend on the request, built once. The driver
+# only reads them, so concurrent requests can share them.
+_PLAN_FLAG_PROJECTION = {"$project": {"_id": 0, "id": 1, "isPremium": 1}}
+_BATCH_COUNT_PROJECTION = {"$project": {"_id": 0, "user_id": 1, "created_at": 1}}
+_COUNTS_PROJECTION = {"$project": {
+    "isPremium": 1,
+    "monthly": {"$ifNull": [{"$arrayElemAt": ["$counts.monthly", 0]}, 0]},
+    "total": {"$ifNull": [{"$arrayElemAt": ["$counts.total", 0]}, 0]}
+}}
+
+
+@lru_cache(maxsize=4)
+def _count_group_stage(group_key, start_of_month: datetime) -> dict:
+    """$group stage counting assessments in total and since `start_of_month`."""
+    return {"$group": {
+        "_id": group_key,
+        "total": {"$sum": 1},
+        "monthly": {"$sum": {
+            "$cond": [{"$gte": ["$created_at", start_of_month]}, 1, 0]
+        }}
+    }}
+
+
+@lru_cache(maxsize=2)
+def _usage_lookup_stage(start_of_month: datetime) -> dict:
+    """$lookup stage that counts the matched user's assessments."""
+    return {"$lookup": {
+        "from": "assessments",
+        # Concise correlated form (MongoDB 5.0+): the join is a plain
+        # equality on user_id, which the usage index serves. An $expr
+        # $eq in the sub-pipeline would be a residual filter instead.
+        "localField": "id",
+        "foreignField": "user_id",
+        "pipeline": [
+            # Only created_at flows into the $group, not the assessment
+            # documents (which carry the uploaded audio)
+            {"$project": {"_id": 0, "created_at": 1}},
+            _count_group_stage(None, start_of_month)
+        ],
+        "as": "counts"
+    }}
+
 
 class UsageService:
     """
@@ -9,61 +115,308 @@ class UsageService:
     Standard (₹499/month): 30 assessments per month
     """
     
-    def __init__(self, db: AsyncIOMotorClient):
+    def __init__(self, db: AsyncDatabase, use_counters: bool = False):
         self.db = db
-        self.plans = {
-            "free": {
-                "max_assessments": 500,
-                "is_monthly": False  # Total limit, not monthly
-            },
-            "standard": {
-                "max_assessments": 30,
-                "is_monthly": True
-            }
-        }
+        # Read-only handles for usage reads that tolerate replication lag
+        self.users_ro = db.users.with_options(
+            read_preference=ReadPreference.SECONDARY_PREFERRED
+        )
+        self.assessments_ro = db.assessments.with_options(
+            read_preference=ReadPreference.SECONDARY_PREFERRED
+        )
+        # Read usage from counters kept on the user document (maintained by
+        # track_analysis) instead of counting assessments on every load
+        self.use_counters = use_counters
+        # user_id -> (expires_at, "YYYY-MM", usage tuple from _load_usage).
+        # The month is checked on read so a cached monthly count never
+        # outlives its period. Kept in LRU order and capped at
+        # USAGE_CACHE_MAX_ENTRIES.
+        self._cache = OrderedDict()
+    
+    def invalidate(self, user_id: str):
+        """
+        Drop cached usage for a user. Call after creating an assessment.
+        """
+        self._cache.pop(user_id, None)
+    
+    async def ensure_indexes(self):
+        """
+        Create the assessments index the usage counts rely on (no-op if present)
+        """
+        await self.db.assessments.create_index(USAGE_INDEX_KEYS, name=USAGE_INDEX_NAME)
+    
+    async def track_analysis(self, user_id: str):
+        """
+        Record a newly created assessment. Call right after inserting it.
+        """
+        try:
+            if self.use_counters:
+                period, start_of_month = current_month()
+                # Single atomic update that also starts a fresh monthly count
+                # when the stored period has rolled over
+                result = await self.db.users.update_one(
+                    {"id": user_id, "usage_total": {"$exists": True}},
+                    [{"$set": {
+                        "usage_total": {"$add": ["$usage_total", 1]},
+                        "usage_monthly": {"$cond": [
+                            {"$eq": ["$usage_period", period]},
+                            {"$add": [{"$ifNull": ["$usage_monthly", 0]}, 1]},
+                            1
+                        ]},
+                        "usage_period": period
+                    }}]
+                )
+                if result.matched_count == 0:
+                    # Not seeded yet, possibly with a seed in flight that
+                    # counted before this insert. Seed from a count taken
+                    # now, which includes it; the larger seed wins.
+                    usage = await self._count_usage(user_id, start_of_month, primary=True)
+                    await self._seed_counters(user_id, usage, period)
+        finally:
+            self.invalidate(user_id)
+    
+    def _cached_usage(self, user_id: str, month: str):
+        """
+        Return the cached usage tuple for this month, or None if absent/expired
+        """
+        entry = self._cache.get(user_id)
+        if entry is not None:
+            expires_at, cached_month, usage = entry
+            if expires_at >= time.monotonic() and cached_month == month:
+                self._cache.move_to_end(user_id)
+                return usage
+            del self._cache[user_id]
+        return None
+    
+    async def _limit_reached(self, user_id: str, plan: PlanSpec, start_of_month: datetime,
+                             primary: bool = False) -> bool:
+        """
+        Check whether the user has hit the plan limit without counting: look for
+        the limit-th newest assessment in the period. Reads at most
+        max_assessments index entries and never fetches a document.
+        """
+        assessments = self.db.assessments if primary else self.assessments_ro
+        query = {"user_id": user_id}
+        if plan.is_monthly:
+            query["created_at"] = {"$gte": start_of_month}
+        
+        nth = await assessments.find_one(
+            query,
+            {"_id": 0, "created_at": 1},
+            sort=[("created_at", DESCENDING)],
+            skip=plan.max_assessments - 1,
+            hint=USAGE_INDEX_HINT
+        )
+        return nth is not None
+    
+    async def _load_usage(self, user_id: str, primary: bool = False) -> tuple:
+        """
+        Load a user's plan flag and assessment counts, shared by both public methods.
+        With primary=True the cache is skipped and everything is read from the primary.
+        Returns: (is_premium, monthly_count, total_count)
+        """
+        month, start_of_month = current_month()
+        
+        if not primary:
+            usage = self._cached_usage(user_id, month)
+            if usage is not None:
+                return usage
+        
+        if self.use_counters:
+            usage = await self._read_counters(user_id, month, start_of_month, primary)
+        else:
+            usage = await self._count_usage(user_id, start_of_month, primary)
+        
+        self._cache[user_id] = (time.monotonic() + USAGE_CACHE_TTL_SECONDS, month, usage)
+        self._cache.move_to_end(user_id)
+        if len(self._cache) > USAGE_CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+        return usage
+    
+    async def _read_counters(self, user_id: str, month: str, start_of_month: datetime,
+                             primary: bool = False) -> tuple:
+        """
+        Read usage from the counters on the user document, seeding them on first use
+        """
+        users = self.db.users if primary else self.users_ro
+        user = await users.find_one(
+            {"id": user_id},
+            {"_id": 0, "isPremium": 1, "usage_total": 1, "usage_monthly": 1, "usage_period": 1}
+        )
+        
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        if "usage_total" not in user:
+            # Count once (on the primary, since it's persisted) and store
+            # that as the starting point
+            usage = await self._count_usage(user_id, start_of_month, primary=True)
+            await self._seed_counters(user_id, usage, month)
+            return usage
+        
+        # A stale period means nothing has been tracked this month yet; the
+        # next track_analysis resets the stored count
+        monthly_count = user.get("usage_monthly", 0) if user.get("usage_period") == month else 0
+        return (bool(user.get("isPremium", False)), monthly_count, user["usage_total"])
+    
+    async def _seed_counters(self, user_id: str, usage: tuple, month: str):
+        """
+        Store counted usage as the user's counters. Seeds can race each other
+        and track_analysis, so each field keeps the larger of the stored and
+        counted values rather than the first or last write.
+        """
+        _, monthly_count, total_count = usage
+        await self.db.users.update_one(
+            {"id": user_id},
+            [{"$set": {
+                "usage_total": {"$max": [{"$ifNull": ["$usage_total", 0]}, total_count]},
+                "usage_monthly": {"$cond": [
+                    {"$eq": ["$usage_period", month]},
+                    {"$max": [{"$ifNull": ["$usage_monthly", 0]}, monthly_count]},
+                    monthly_count
+                ]},
+                "usage_period": month
+            }}]
+        )
+    
+    async def _count_usage(self, user_id: str, start_of_month: datetime,
+                           primary: bool = False) -> tuple:
+        """
+        Count a user's assessments directly
+        """
+        users = self.db.users if primary else self.users_ro
+        # Fetch the user's plan flag and both assessment counts in one
+        # round-trip, walking the user's assessments once.
+        pipeline = [
+            {"$match": {"id": user_id}},
+            # Drop the rest of the user document before it flows through the
+            # lookup; only the plan flag is needed
+            _PLAN_FLAG_PROJECTION,
+            _usage_lookup_stage(start_of_month),
+            _COUNTS_PROJECTION
+        ]
+        cursor = await users.aggregate(pipeline)
+        results = await cursor.to_list(length=1)
+        
+        if not results:
+            raise HTTPException(status_code=404, detail="User not found")
+        user = results[0]
+        
+        return (bool(user.get("isPremium", False)), user["monthly"], user["total"])
     
     async def check_can_create_assessment(self, user_id: str) -> dict:
         """
         Check if user can create a new assessment based on their plan
         Returns: {"allowed": bool, "reason": str, "usage": dict}
         """
-        # Get user subscription
-        user = await self.db.users.find_one({"id": user_id})
+        month, start_of_month = current_month()
         
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        cached = self._cached_usage(user_id, month)
+        if cached is None:
+            return await self._check_loaded(user_id)
+        
+        # Cached usage may be stale if another worker created assessments
+        # since it was loaded. A denial from it stands (counts only grow
+        # within a period), but confirm an allow. With counters that is one
+        # read of the exact counts; otherwise the bounded probe avoids
+        # recounting everything. Near the limit the probe reads from the
+        # primary.
+        result = self._check_result(*cached)
+        if not result["allowed"]:
+            return result
+        
+        if self.use_counters:
+            self.invalidate(user_id)
+            return await self._check_loaded(user_id)
+        
+        is_premium = cached[0]
+        limit_reached = await self._limit_reached(
+            user_id, _PLANS_BY_BOOL[is_premium], start_of_month,
+            primary=self._near_limit(*cached)
+        )
+        
+        if limit_reached:
+            self.invalidate(user_id)
+            return self._check_result(*await self._load_usage(user_id, primary=True))
+        return result
+    
+    async def _check_loaded(self, user_id: str) -> dict:
+        """
+        check_can_create_assessment on freshly loaded usage
+        """
+        usage = await self._load_usage(user_id)
+        result = self._check_result(*usage)
+        # A denial from a lagging read stands; an allow close to the
+        # limit is confirmed on the primary
+        if result["allowed"] and self._near_limit(*usage):
+            result = self._check_result(*await self._load_usage(user_id, primary=True))
+        return result
+    
+    async def check_many(self, user_ids: List[str]) -> Dict[str, dict]:
+        """
+        Batch version of check_can_create_assessment for bulk jobs (e.g. limit
+        reminders). Always counts assessments and bypasses the per-user cache.
+        Users that don't exist are left out of the result.
+        Returns: {user_id: {"allowed": bool, "reason": str, "usage": dict}}
+        """
+        _, start_of_month = current_month()
+        
+        async def count_by_user():
+            cursor = await self.assessments_ro.aggregate([
+                {"$match": {"user_id": {"$in": user_ids}}},
+                # Only indexed fields, as in the per-user count
+                _BATCH_COUNT_PROJECTION,
+                _count_group_stage("$user_id", start_of_month)
+            ], hint=USAGE_INDEX_HINT)
+            return await cursor.to_list(None)
         
-        # Determine plan
-        is_premium = user.get("isPremium", False)
-        plan_type = "standard" if is_premium else "free"
-        plan = self.plans[plan_type]
+        # Two round-trips for the whole batch: the users' plan flags, and
+        # every user's assessment counts grouped in one index scan
+        users, counts = await asyncio.gather(
+            self.users_ro.find(
+                {"id": {"$in": user_ids}},
+                {"_id": 0, "id": 1, "isPremium": 1}
+            ).to_list(None),
+            count_by_user()
+        )
         
-        # Get assessment count
-        if plan["is_monthly"]:
-            # Count assessments this month for premium users
-            start_of_month = datetime.now(timezone.utc).replace(
-                day=1, hour=0, minute=0, second=0, microsecond=0
+        counts_by_user = {doc["_id"]: (doc["monthly"], doc["total"]) for doc in counts}
+        results = {}
+        for user in users:
+            monthly_count, total_count = counts_by_user.get(user["id"], (0, 0))
+            results[user["id"]] = self._check_result(
+                bool(user.get("isPremium", False)), monthly_count, total_count
             )
-            count = await self.db.assessments.count_documents({
-                "user_id": user_id,
-                "created_at": {"$gte": start_of_month}
-            })
-        else:
-            # Count total assessments for free users
-            count = await self.db.assessments.count_documents({
-                "user_id": user_id
-            })
+        return results
+    
+    def _near_limit(self, is_premium: bool, monthly_count: int, total_count: int) -> bool:
+        """
+        Whether loaded usage is close enough to the plan limit that a
+        secondary read should be confirmed on the primary
+        """
+        plan = _PLANS_BY_BOOL[is_premium]
+        count = monthly_count if plan.is_monthly else total_count
+        return count >= plan.max_assessments * PRIMARY_RECHECK_RATIO
+    
+    def _check_result(self, is_premium: bool, monthly_count: int, total_count: int) -> dict:
+        """
+        Build the check_can_create_assessment response from loaded usage
+        """
+        plan = _PLANS_BY_BOOL[is_premium]
+        count = monthly_count if plan.is_monthly else total_count
         
         usage = {
             "used": count,
-            "limit": plan["max_assessments"],
-            "plan": plan_type
+            "limit": plan.max_assessments,
+            "plan": plan.name
         }
         
-        if count >= plan["max_assessments"]:
+        if count >= plan.max_assessments:
             return {
                 "allowed": False,
-                "reason": f"You've reached your {plan_type} plan limit of {plan['max_assessments']} assessments{'per month' if plan['is_monthly'] else ''}. Please upgrade to continue.",
+                "reason": (_REASON_MONTHLY if plan.is_monthly else _REASON_TOTAL).format(
+                    plan=plan.name, limit=plan.max_assessments
+                ),
                 "usage": usage
             }
         
@@ -77,44 +430,18 @@ class UsageService:
         """
         Get current usage statistics for a user
         """
-        user = await self.db.users.find_one({"id": user_id})
+        is_premium, monthly_count, total_count = await self._load_usage(user_id)
         
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+        plan = _PLANS_BY_BOOL[is_premium]
         
-        is_premium = user.get("isPremium", False)
-        plan_type = "standard" if is_premium else "free"
-        plan = self.plans[plan_type]
+        # Same shape for every plan; "used" is what counts against the limit
+        used = monthly_count if plan.is_monthly else total_count
+        remaining = plan.max_assessments - used
         
-        # Get counts
-        if plan["is_monthly"]:
-            start_of_month = datetime.now(timezone.utc).replace(
-                day=1, hour=0, minute=0, second=0, microsecond=0
-            )
-            monthly_count = await self.db.assessments.count_documents({
-                "user_id": user_id,
-                "created_at": {"$gte": start_of_month}
-            })
-            total_count = await self.db.assessments.count_documents({
-                "user_id": user_id
-            })
-            
-            return {
-                "plan": plan_type,
-                "monthly_used": monthly_count,
-                "monthly_limit": plan["max_assessments"],
-                "total_assessments": total_count,
-                "remaining": max(0, plan["max_assessments"] - monthly_count)
-            }
-        else:
-            total_count = await self.db.assessments.count_documents({
-                "user_id": user_id
-            })
-            
-            return {
-                "plan": plan_type,
-                "used": total_count,
-                "limit": plan["max_assessments"],
-                "total_assessments": total_count,
-                "remaining": max(0, plan["max_assessments"] - total_count)
-            }
+        return {
+            "plan": plan.name,
+            "used": used,
+            "limit": plan.max_assessments,
+            "total_assessments": total_count,
+            "remaining": remaining if remaining > 0 else 0
+        }
@@ -228,10 +228,10 @@ def test_usage_endpoints(session_token, premium_session_token=None, premium_user
                 usage_data = response.json()
                 print(f"✅ Usage endpoint working for premium user")
                 print(f"   Plan: {usage_data.get('plan', 'Unknown')}")
-                print(f"   Monthly Used: {usage_data.get('monthly_used', 0)}")
-                print(f"   Monthly Limit: {usage_data.get('monthly_limit', 0)}")
+                print(f"   Monthly Used: {usage_data.get('used', 0)}")
+                print(f"   Monthly Limit: {usage_data.get('limit', 0)}")
                 
-                if usage_data.get('plan') == 'standard' and usage_data.get('monthly_limit') == 30:
+                if usage_data.get('plan') == 'standard' and usage_data.get('limit') == 30:
                     print("✅ Premium plan limits correctly configured")
                 else:
                     print("⚠️ Premium plan configuration may be incorrect")